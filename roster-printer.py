@@ -1,14 +1,29 @@
 """Prints rosters"""
+from __future__ import annotations
 import os
+import re
 import sys
+import hashlib
+import shutil
+import subprocess
 import logging
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from tempfile import TemporaryDirectory
+from itertools import cycle, repeat
+from tempfile import TemporaryDirectory, mkstemp
+from typing import TYPE_CHECKING
 import yaml
-import pandas as pd
 from fpdf import FPDF
-import dateparser
+from fpdf.fonts import FontFace
+
+# pandas and pyarrow are slow to import, so they are only
+# imported where they are used. Bad config or a missing spreadsheet
+# can then fail without waiting on them
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pandas as pd
 
 logger = logging.getLogger("roster-printer")
 
@@ -18,6 +33,23 @@ PRINT_ROSTERS = not DEBUG
 USE_TEMPDIR = not DEBUG
 LOG_LEVEL = logging.DEBUG if DEBUG else logging.INFO
 
+# alternating fill of the roster rows: white, shaded gray
+ROW_FILL_COLORS = (255, 200)
+
+REQUIRED_CONFIG_KEYS = frozenset((
+    "spreadsheet-pattern",
+    "columns-to-print",
+    "class-column-name",
+    "search-dir",
+))
+
+# built pdfs are kept here so unchanged rosters aren't rebuilt on the next run.
+# only the pdfs of the newest spreadsheet are kept
+CACHE_DIR = os.getenv("ROSTER_PRINTER_CACHE_DIR",
+                      os.path.join(os.path.expanduser("~"), ".cache", "roster-printer"))
+# names of the per spreadsheet directories in CACHE_DIR, see get_cache_dir()
+CACHE_DIR_PATTERN = re.compile(r"\d+_\d{6}")
+
 class RosterPDF(FPDF):
     """Adds footer to base class"""
     def __init__(self, footer_str="", **kwargs):
@@ -35,21 +67,23 @@ def find_latest_spreadsheet(search_dir: str, search_str: str) -> os.PathLike:
     returns the newest file in `search_dir` that contains `search_str`
     """
     newest_file = ""
-
-    files = os.listdir(search_dir)
-    # matching_files = [file for file in files if file.contains(search_str)]
-
-    for filename in files:
-        if search_str not in filename:
-            logger.debug(f"{search_str} not in basename of {filename}")
-            continue
-
-        full_path = os.path.join(search_dir, filename)
-
-        if not newest_file or \
-                os.path.getmtime(full_path) > os.path.getmtime(newest_file):
-            newest_file = full_path
-            logger.debug(f"new latest files: {newest_file=}")
+    newest_mtime = -1.0
+    # checked once, so the f-strings below are only built when they will be logged
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    # scandir entries cache their stat, so each file is only stat'ed once
+    with os.scandir(search_dir) as entries:
+        for entry in entries:
+            if search_str not in entry.name:
+                if debug_enabled:
+                    logger.debug(f"{search_str} not in basename of {entry.name}")
+                continue
+
+            mtime = entry.stat().st_mtime
+            if mtime > newest_mtime:
+                newest_mtime, newest_file = mtime, entry.path
+                if debug_enabled:
+                    logger.debug(f"new latest files: {newest_file=}")
 
     logger.debug(f"{newest_file=}")
     return newest_file
@@ -58,20 +92,186 @@ def find_latest_spreadsheet(search_dir: str, search_str: str) -> os.PathLike:
 def check_for_required_config(config_to_check: dict) -> None:
     """Checks that all required keys in config are present"""
 
-    required_keys = [
-        "spreadsheet-pattern",
-        "columns-to-print",
-        "class-column-name",
-        "search-dir",
-    ]
-
-    for key in required_keys:
-        if key not in config_to_check.keys():
-            raise KeyError(f"Required config `{key}` not found, check that file "
-                           "at CONFIG_FILE contains key")
+    missing_keys = REQUIRED_CONFIG_KEYS.difference(config_to_check)
+    if missing_keys:
+        raise KeyError(f"Required config {sorted(missing_keys)} not found, check that file "
+                       "at CONFIG_FILE contains keys")
 
     logger.debug("config has all required keys")
 
+
+def get_needed_columns(config_to_check: dict) -> set:
+    """Returns the names of the spreadsheet columns the config actually uses"""
+
+    needed = set(config_to_check["columns-to-print"])
+    needed.add(config_to_check["class-column-name"])
+    if config_to_check.get("date-column"):
+        needed.add(config_to_check["date-column"])
+    for modify_data in config_to_check.get("modify-columns", []):
+        needed.update(modify_data["old-columns"])
+
+    logger.debug(f"{needed=}")
+    return needed
+
+def merge_columns(roster: pd.DataFrame, columns: list, separator: str) -> pd.Series:
+    """
+    joins the `columns` of `roster` row-wise with `separator`, skipping empty cells
+    """
+    # column-at-a-time string ops instead of a python function per row
+    parts = [roster[column].astype("string") for column in columns]
+    merged = parts[0]
+    for part in parts[1:]:
+        # NA wherever either side is empty, which the fillnas then fall back on
+        joined = merged + separator + part
+        merged = joined.fillna(merged).fillna(part)
+
+    return merged.fillna("")
+
+
+def modify_roster_columns(roster: pd.DataFrame, modify_columns: list, keep_columns: set) -> None:
+    """
+    merges columns of `roster` in place as described by the `modify-columns` config.
+    source columns that aren't in `keep_columns` are dropped afterwards
+    """
+    unused_columns = set()
+
+    for modify_data in modify_columns:
+        if modify_data["new-name"] in roster.columns:
+            raise ValueError(f"new column name {modify_data['new-name']} already exists in roster")
+        # apply modifications
+        logger.debug(f"merging columns {modify_data['old-columns']} into {modify_data['new-name']}")
+        roster[modify_data["new-name"]] = merge_columns(roster, modify_data["old-columns"],
+                                                        modify_data["separator"])
+        unused_columns.update(c for c in modify_data["old-columns"] if c not in keep_columns)
+
+    # a single drop at the end, as later merges may reuse earlier source columns
+    roster.drop(columns=list(unused_columns), inplace=True)
+
+
+def roster_to_string_table(roster: pd.DataFrame, columns: list) -> pa.Table | None:
+    """
+    returns `columns` of `roster` as an arrow table of strings, with empty cells as "",
+    or None if there are no `columns`
+    """
+    import pyarrow as pa
+
+    if not columns:
+        return None
+
+    # convert every cell to a string once up front, so measuring and
+    # drawing the pdf table don't need to check each one for NA
+    return pa.Table.from_pandas(roster[columns].astype("string[pyarrow]").fillna(""), preserve_index=False)
+
+
+def iter_table_rows(table: pa.Table | None, num_rows: int = 0, chunk_size: int = 256):
+    """
+    yields the rows of `table` as tuples of strings.
+    only `chunk_size` rows are converted to python objects at a time.
+    a `table` of None yields `num_rows` empty rows, to pair with another table
+    """
+    if table is None:
+        yield from repeat((), num_rows)
+        return
+
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def get_column_widths(pdf: FPDF, table: pa.Table | None, max_width: float,
+                      headers: list | None = None, total=sum) -> list:
+    """
+    returns the width each column of `table` needs to fit its header and every cell
+    on one line, in the current font of `pdf`.
+    stops measuring once `total(widths)` is over `max_width`, as the table can't fit then
+    """
+    if table is None:
+        return []
+
+    widths = [0.0] * table.num_columns
+    if headers:
+        # headers are printed in bold
+        pdf.set_font(style="B")
+        widths = [pdf.get_string_width(header) for header in headers]
+        pdf.set_font(style="")
+
+    get_string_width = pdf.get_string_width
+    for data_row in iter_table_rows(table):
+        widths = [max(width, get_string_width(datum)) for width, datum in zip(widths, data_row)]
+        if total(widths) > max_width:
+            break
+
+    padding = 2 * pdf.c_margin
+    return [width + padding for width in widths]
+
+
+def add_roster_table(pdf: FPDF, normal_cols: list, normal_rows, extra_rows) -> None:
+    """
+    Adds the roster `normal_rows` and matching `extra_rows` to `pdf`
+    using fpdf's table, which wraps cells that are too wide
+    """
+    # prebuilt once instead of restyling a font face on every row
+    row_styles = cycle([FontFace(fill_color=fill_color) for fill_color in ROW_FILL_COLORS])
+
+    with pdf.table(
+        borders_layout="MINIMAL",
+        # cell_fill_color=200,
+        # cell_fill_mode="ROWS", # this doesn't work when I want two rows with the same color
+        text_align="CENTER",
+    ) as table:
+        table_row = table.row
+
+        # fpdf table expects the header to be in the first row
+        header_row = table_row()
+        for column in normal_cols:
+            header_row.cell(column)
+
+        # extra rows take the style of the row above, so both rows of an entry share a shade
+        for style, data_row, extra_data in zip(row_styles, normal_rows, extra_rows):
+            row = table_row()
+            row_cell = row.cell
+            for datum in data_row:
+                row_cell(datum, style=style)
+
+            for datum in extra_data:
+                if datum:
+                    table_row().cell(datum, colspan=len(normal_cols), style=style)
+
+
+def add_roster_cells(pdf: FPDF, normal_cols: list, normal_rows, extra_rows, col_widths: list) -> None:
+    """
+    Adds the roster `normal_rows` and matching `extra_rows` to `pdf` one cell at a time
+    with fixed `col_widths`, drawn to look like the table from `add_roster_table`. No cell is wrapped
+    """
+    row_height = 2 * pdf.font_size
+    table_width = sum(col_widths)
+    cell = pdf.cell
+
+    def add_header():
+        pdf.set_font(style="B")
+        for n, (width, column) in enumerate(zip(col_widths, normal_cols)):
+            cell(width, row_height, text=column, border="B" if n == 0 else "LB", align="C")
+        pdf.ln(row_height)
+        pdf.set_font(style="")
+
+    add_header()
+    for fill_color, data_row, extra_data in zip(cycle(ROW_FILL_COLORS), normal_rows, extra_rows):
+        extra_data = [datum for datum in extra_data if datum]
+
+        # keep an entry and its extra rows together, and repeat the header on each page
+        if pdf.will_page_break(row_height * (1 + len(extra_data))):
+            pdf.add_page()
+            add_header()
+
+        pdf.set_fill_color(fill_color)
+        for n, (width, datum) in enumerate(zip(col_widths, data_row)):
+            cell(width, row_height, text=datum, border=0 if n == 0 else "L", align="C", fill=True)
+        pdf.ln(row_height)
+
+        for datum in extra_data:
+            cell(table_width, row_height, text=datum, align="C", fill=True)
+            pdf.ln(row_height)
+
+
 def roster_to_pdf(roster: pd.DataFrame, file_path, title, **kwargs) -> None:
     """Creates a nicly formatted pdf of the `roster` at `file_path`"""
 
@@ -88,10 +288,34 @@ def roster_to_pdf(roster: pd.DataFrame, file_path, title, **kwargs) -> None:
     normal_cols = [x for x in config['columns-to-print'] if x not in config.get('use-extra-row', [])]
 
     # modified example from https://py-pdf.github.io/fpdf2/Maths.html#using-pandas
-    pdf = RosterPDF(orientation=config.get("orientation", "P"),
+    orientation = config.get("orientation", "")
+    pdf = RosterPDF(orientation=orientation or "P",
                format="Letter",
                unit="pt",
                footer_str=footer_str)
+
+    # split the cells up front, so drawing them doesn't need to
+    # check which column each cell belongs to
+    normal_table = roster_to_string_table(roster, normal_cols)
+    extra_table = roster_to_string_table(roster, [x for x in config['columns-to-print'] if x not in normal_cols])
+
+    # measure the table before anything is drawn, to pick an orientation it fits in.
+    # landscape is the widest the table gets, unless the orientation is configured
+    pdf.set_font('helvetica', size=12)
+    max_width = pdf.epw if orientation else pdf.h - pdf.l_margin - pdf.r_margin
+    col_widths = get_column_widths(pdf, normal_table, max_width, headers=normal_cols)
+    extra_width = max(get_column_widths(pdf, extra_table, max_width, total=max), default=0)
+    table_width = max(sum(col_widths), extra_width)
+
+    # without a configured orientation, use landscape if
+    # that is the only way the cells fit without wrapping
+    if not orientation and pdf.epw < table_width <= max_width:
+        logger.debug(f"using landscape for {title}, {table_width=} is wider than portrait")
+        pdf = RosterPDF(orientation="L",
+                   format="Letter",
+                   unit="pt",
+                   footer_str=footer_str)
+
     pdf.set_title(title)
     pdf.add_page()
 
@@ -104,89 +328,244 @@ def roster_to_pdf(roster: pd.DataFrame, file_path, title, **kwargs) -> None:
 
     # add table
     pdf.set_font('helvetica', size=12)
-    with pdf.table(
-        borders_layout="MINIMAL",
-        # cell_fill_color=200,
-        # cell_fill_mode="ROWS", # this doesn't work when I want two rows with the same color
-        text_align="CENTER",
-    ) as table:
-        # get current style for the table
-        fontface = pdf.font_face()
 
-        # fpdf table expects the header to be in the first row
-        # in an iterable. Dataframes store them seperately, so we
-        # must combine them for this to work nicely
-        for n, data_row in enumerate([normal_cols] + roster.values.tolist()):
-            row = table.row()
-            # this works
-            # so I need to enumerate it and count.
-            if n % 2 == 0:
-                fontface.fill_color = 200 # shaded gray
-            else:
-                fontface.fill_color = 255 # white
-
-            for n, datum in enumerate(data_row):
-                if n >= len(normal_cols):
-                    # FIXME: keep correct shading.
-                    if not pd.isna(datum):
-                        extra_row = table.row(style=row.style)
-
-                        extra_row.cell(datum, colspan=len(normal_cols),style=fontface, )
-                elif pd.isna(datum):
-                    row.cell("")
-                else:
-                    row.cell(datum)
+    # fpdf's table measures and wraps every cell, which is slow for long rosters.
+    # when every cell fits on one line the rows can be drawn directly instead
+    if col_widths and table_width <= pdf.epw:
+        # stretch the columns to the full page width, like the table does
+        add_roster_cells(pdf, normal_cols, iter_table_rows(normal_table, len(roster)),
+                         iter_table_rows(extra_table, len(roster)),
+                         [w * pdf.epw / sum(col_widths) for w in col_widths])
+    else:
+        add_roster_table(pdf, normal_cols, iter_table_rows(normal_table, len(roster)),
+                         iter_table_rows(extra_table, len(roster)))
 
     pdf.output(file_path)
     logger.debug(f"created pdf {file_path}")
 
 
-def print_roster(roster: pd.DataFrame, title: str, tempdir: os.PathLike, **kwargs) -> None:
-    """Prints a `roster` with the title: `title`"""
+def get_cache_path(title: str, **kwargs) -> str:
+    """
+    returns the path a roster pdf titled `title` is cached at,
+    keyed on the spreadsheet mtime, session metadata and config
+    """
+    # the print time is left out, it changes every run
+    key_metadata = sorted((k, v) for k, v in kwargs.items() if k != "date_printed")
+    key_str = f"{title}:{key_metadata}:{yaml.dump(config)}"
+    key = hashlib.blake2b(key_str.encode()).hexdigest()[:16]
+    return os.path.join(get_cache_dir(kwargs.get("spreadsheet_mtime")), f"{key}.pdf")
+
+
+def get_cache_dir(spreadsheet_mtime: float) -> str:
+    """returns the cache directory for pdfs built from a spreadsheet modified at `spreadsheet_mtime`"""
+    return os.path.join(CACHE_DIR, f"{spreadsheet_mtime:.6f}".replace(".", "_"))
 
-    tmp_file_path = os.path.join(tempdir, f"{title}.pdf")
-    roster_to_pdf(roster, tmp_file_path, title=title, **kwargs)
+
+def prune_cache(keep_dir: str = "") -> None:
+    """
+    removes everything in CACHE_DIR except the finished pdfs in `keep_dir`.
+    rosters contain personal details, so pdfs of older spreadsheets are not kept around
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    # CACHE_DIR may be set to any directory, so only the directories from get_cache_dir() are touched
+    with os.scandir(CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.path != keep_dir and entry.is_dir() and CACHE_DIR_PATTERN.fullmatch(entry.name):
+                logger.debug(f"removing old cache entry {entry.path}")
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    # left over from a run that was stopped mid copy
+    if keep_dir and os.path.isdir(keep_dir):
+        with os.scandir(keep_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+
+
+def store_cached_pdf(file_path: os.PathLike, cache_path: str) -> None:
+    """Copies the pdf at `file_path` into the cache at `cache_path`"""
+
+    # copy under a temporary name first, so an interrupted copy
+    # can never be mistaken for a cached pdf
+    fd, tmp_path = mkstemp(suffix=".tmp", dir=os.path.dirname(cache_path))
+    os.close(fd)
+    try:
+        shutil.copy(file_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def init_worker(worker_config: dict) -> None:
+    """Gives a pdf worker process the config and logging of the parent process"""
+    # worker processes don't run the __main__ block, so config has to be passed in
+    global config  # pylint: disable=global-variable-undefined,global-statement
+    config = worker_config
+    logging.basicConfig(stream=sys.stdout, level=LOG_LEVEL)
+
+
+def print_roster(file_path: os.PathLike, title: str) -> None:
+    """Prints the roster pdf at `file_path` with the title: `title`"""
 
     if PRINT_ROSTERS is True:
         logger.info(f"printing {title}.pdf")
-        os.startfile(tmp_file_path, "print")
+        os.startfile(file_path, "print")
     else:
         logger.info(f"opening {title}.pdf")
-        os.startfile(tmp_file_path, "open")
+        os.startfile(file_path, "open")
+
+
+def get_session_jobs(sessions, tempdir: os.PathLike, **kwargs) -> list:
+    """
+    Returns a `(file_path, title, cache_path, session_df)` job for each session.
+    Cached pdfs are copied into `tempdir` right away and get `None` as `session_df`
+    """
+    # the print time changes every run, so a cached pdf that shows it can never be reused
+    use_cache = not config.get("show-print-date", "")
+    cache_dir = get_cache_dir(kwargs.get("spreadsheet_mtime")) if use_cache else ""
+    # only the pdfs of the current spreadsheet are kept, or none if the cache isn't used
+    prune_cache(keep_dir=cache_dir)
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    jobs = []
+    for session, session_df in sessions:
+        title = f"{session} {config['title-suffix']}"
+        file_path = os.path.join(tempdir, f"{title}.pdf")
+        cache_path = get_cache_path(title, **kwargs) if use_cache else ""
+
+        if cache_path and os.path.exists(cache_path):
+            logger.debug(f"using cached pdf {cache_path} for session of name: {session}")
+            shutil.copy(cache_path, file_path)
+            session_df = None
+        jobs.append((file_path, title, cache_path, session_df))
+
+    return jobs
+
+
+def print_sessions(sessions, tempdir: os.PathLike, **kwargs) -> list:
+    """
+    Builds the pdf of each session, in parallel when there are several, then prints them in session order.
+    Returns the paths of the pdfs that another program may still need to pick up
+    """
+    # sumatra can print every roster in one call instead of one shell print per file
+    batch_print = PRINT_ROSTERS is True and bool(config.get("sumatra-path", ""))
+    jobs = get_session_jobs(sessions, tempdir, **kwargs)
+
+    # each worker re-imports this script and pandas, which costs more than
+    # it saves unless at least two rosters can be built at the same time
+    max_workers = min(sum(session_df is not None for _, _, _, session_df in jobs), os.cpu_count() or 1)
+
+    with (ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(config,))
+          if max_workers >= 2 else nullcontext()) as executor:
+        builds = [
+            executor.submit(roster_to_pdf, session_df, file_path, title=title, **kwargs)
+            if executor is not None and session_df is not None else None
+            for file_path, title, _, session_df in jobs
+        ]
+
+        # sending to the printer stays in this process so the spooler
+        # receives the rosters in order. Each roster is sent as soon as it
+        # is built, while the workers keep building the rest
+        for (file_path, title, cache_path, session_df), build in zip(jobs, builds):
+            if session_df is not None:
+                logger.debug(f"building {title}")
+                logger.debug(f"{session_df}")
+                if build is not None:
+                    build.result()
+                else:
+                    roster_to_pdf(session_df, file_path, title=title, **kwargs)
+            if not batch_print:
+                print_roster(file_path, title)
+            # caching is not needed to print, so it waits until the roster is sent
+            if session_df is not None and cache_path:
+                store_cached_pdf(file_path, cache_path)
+
+    file_paths = [file_path for file_path, _, _, _ in jobs]
+    if batch_print and file_paths:
+        print_rosters_batch(file_paths)
+        # sumatra only returns once it has finished with the files
+        return []
+
+    return file_paths
+
+
+def print_rosters_batch(file_paths: list) -> None:
+    """Prints all of `file_paths`, in order, with a single call to SumatraPDF"""
+
+    logger.info(f"printing {len(file_paths)} rosters with {config['sumatra-path']}")
+    subprocess.run([config["sumatra-path"], "-print-to-default", "-silent", *file_paths], check=True)
+
+
+def file_in_use(file_path: os.PathLike) -> bool:
+    """Returns True if another process (e.g. the print spooler) has `file_path` open"""
+    # on windows, renaming a file fails while another process holds it open
+    try:
+        os.rename(file_path, file_path)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+    return False
+
+
+def wait_for_files(file_paths: list, timeout: float, until_released: bool = True) -> None:
+    """
+    Waits until every file in `file_paths` has been opened by another process,
+    and if `until_released`, closed again. Gives up after `timeout` seconds
+    """
+    waiting = set(file_paths)
+    opened = set()
+    deadline = time.monotonic() + timeout
+
+    while waiting and time.monotonic() < deadline:
+        for file_path in list(waiting):
+            if not os.path.exists(file_path):
+                # nothing is left to wait on for a file that is gone
+                logger.debug(f"{file_path} no longer exists")
+                waiting.discard(file_path)
+            elif file_in_use(file_path):
+                opened.add(file_path)
+                if not until_released:
+                    waiting.discard(file_path)
+            elif file_path in opened:
+                # it was picked up and is now closed
+                waiting.discard(file_path)
+        time.sleep(0.2)
+
+    if waiting:
+        logger.debug(f"stopped waiting after {timeout}s on {waiting=}")
 
 
 def print_all_sessions(roster: pd.DataFrame, **kwargs) -> None:
     """Prints all unique sessions in roster, max one per page"""
 
+    # one pass to split the roster by session, in order of first appearance
+    # observed=True skips categories without any rows
+    sessions = roster.groupby(config["class-column-name"], sort=False, observed=True)[config["columns-to-print"]]
+
     # to use the os print utils, the item to print must be a file
     # using TemporaryDirectory() is nicer for cleanup
     # but hard to debug, hence the flag
-    # and because of the context manager, more code has to be duplicated
-    # FIXME: fix the duplication. variable as function?
     if USE_TEMPDIR is True:
         with TemporaryDirectory() as tempdir:
-            for session in pd.unique(roster[config["class-column-name"]].values):
-                logger.debug(f"printing session of name: {session}")
-                # FIXME: is this the best way to query a variable col name?
-                session_df = roster.query(f"{config['class-column-name']} == @session")[config["columns-to-print"]]
-                logger.debug(f"{session_df}")
-                print_roster(session_df, title=f"{session} {config['title-suffix']}", tempdir=tempdir, **kwargs)
+            file_paths = print_sessions(sessions, tempdir, **kwargs)
             # Without this wait, the files get deleted before the print spooler gets them
-            logging.info("waiting for print spooler to receive files")
-            time.sleep(10)
+            if file_paths:
+                logging.info("waiting for print spooler to receive files")
+                wait_for_files(file_paths, timeout=10)
 
     else:
         tempdir = ".temp"
         if not os.path.exists(tempdir):
             os.mkdir(tempdir)
-        for session in pd.unique(roster[config["class-column-name"]].values):
-            logger.debug(f"printing session of name: {session}")
-            # FIXME: is this the best way to query a variable col name?
-            session_df = roster.query(f"{config['class-column-name']} == @session")[config["columns-to-print"]]
-            logger.debug(f"{session_df}")
-            print_roster(session_df, title=f"{session} {config['title-suffix']}", tempdir=tempdir, **kwargs)
-        logging.info("All files should be opened now, waiting 30s before exiting")
-        time.sleep(30)
+        file_paths = print_sessions(sessions, tempdir, **kwargs)
+        # the files aren't deleted here, so they only need to be opened
+        logging.info("waiting up to 30s for all files to be opened before exiting")
+        wait_for_files(file_paths, timeout=30, until_released=False)
 
 if __name__ == "__main__":
     # configure logging
@@ -213,13 +592,21 @@ if __name__ == "__main__":
     extension = os.path.splitext(newest_spreadsheet)[1][1:]
     logger.debug(f"{extension=}")
 
+    # only parse the columns that are used later.
+    # a callable is used so that names which are not in the spreadsheet
+    # (e.g. new names from modify-columns) are ignored instead of raising
+    needed_columns = get_needed_columns(config)
+
+    import pandas as pd
+
     with open(newest_spreadsheet, "rb") as f:
         logger.debug(f"Read roster_df from {newest_spreadsheet}")
+        # arrow backed columns keep strings out of python objects
         if extension == "csv":
-            roster_df = pd.read_csv(f)
+            roster_df = pd.read_csv(f, usecols=lambda c: c in needed_columns, dtype_backend="pyarrow")
         elif extension in ["xls", "xlsx", "xlsm", "xlsb", "odf", "ods", "odt"]:
             # list taken from https://pandas.pydata.org/docs/reference/api/pandas.read_excel.html
-            roster_df = pd.read_excel(f)
+            roster_df = pd.read_excel(f, usecols=lambda c: c in needed_columns, dtype_backend="pyarrow")
         else:
             logger.error(f"File type not supported: {newest_spreadsheet}")
             raise ValueError(f"File type not supported: {newest_spreadsheet}")
@@ -227,22 +614,22 @@ if __name__ == "__main__":
     logger.debug(f"{roster_df=}")
     session_date = roster_df[config.get("date-column")].values[0]
     if config.get('date-format', ""):
-        metadata['session_date_str'] = dateparser.parse(session_date).strftime(config['date-format'])
+        # spreadsheet dates are in regular formats, which pandas parses much faster than dateparser
+        metadata['session_date_str'] = pd.to_datetime(session_date).strftime(config['date-format'])
     else:
         metadata['session_date_str'] = session_date
 
     if "modify-columns" in config.keys():
         logger.debug("modifying columns")
-        for modify_data in config["modify-columns"]:
-            if modify_data["new-name"] in roster_df.columns:
-                raise ValueError(f"new column name {modify_data['new-name']} already exists in roster")
-            # apply modifications
-            logger.debug(f"merging columns {modify_data['old-columns']} into {modify_data['new-name']}")
-            roster_df[modify_data["new-name"]] = roster_df[modify_data["old-columns"]].apply(
-                lambda x: modify_data["separator"].join(x.dropna().astype(str)), axis=1)
-
+        modify_roster_columns(roster_df, config["modify-columns"],
+                              keep_columns=set(config["columns-to-print"]) | {config["class-column-name"]})
         logger.debug(f"{roster_df.info()=}")
 
+    # sessions repeat across many rows, so grouping on category codes
+    # is cheaper than hashing every string.
+    # done after modify-columns, which may be what creates the class column
+    roster_df[config["class-column-name"]] = roster_df[config["class-column-name"]].astype("category")
+
     print_all_sessions(roster_df, **metadata)
 
     logger.info("Printing complete! Please close the window")